@@ -4,28 +4,78 @@
 """
 
 import pandas as pd
-import numpy as np
 import os
-import sys
-from typing import Dict, Any, Tuple, Optional, List
-from data_utils import *
+from pathlib import Path
+from functools import cached_property
+from typing import Dict, Any
 from performance_analyzer import get_performance_analysis
 from portfolio_weights_gen import generate_portfolio_weights
 from rolling_backtest import rolling_backtest, calc_turnover_rate
-from signal_reader import get_stock_list_from_signal
 from data_coverage_checker import check_data_coverage_for_signal
+from cache_utils import (
+    BENCHMARK_CACHE,
+    TRADING_DAYS_CACHE,
+    VWAP_CACHE,
+    read_cached_frame,
+    read_date_partitions,
+)
 from loguru import logger
 
+# ==================== CSV缓存解析（仅在parquet缓存缺失时调用） ====================
+
+# VWAP价格用float32存储即可满足回测精度，内存和带宽减半
+VWAP_DTYPES = {"unadjusted_vwap": "float32", "post_vwap": "float32"}
+
+
+def _index_vwap(vwap_df: pd.DataFrame) -> pd.DataFrame:
+    # 股票代码转为category后按(order_book_id, datetime)排序，
+    # 每只股票的数据在索引中连续，切片可直接按位置定位
+    vwap_df = vwap_df.astype({"order_book_id": "category", **VWAP_DTYPES})
+    vwap_df = vwap_df.set_index(["order_book_id", "datetime"]).sort_index()
+    assert vwap_df.index.is_monotonic_increasing
+    return vwap_df
+
+
+def _parse_vwap_csv(path: str) -> pd.DataFrame:
+    # memory_map直接映射文件，日期在C解析器内完成转换，股票代码存为category
+    vwap_df = pd.read_csv(
+        path,
+        memory_map=True,
+        engine="c",
+        dtype={"order_book_id": "category", **VWAP_DTYPES},
+        parse_dates=["datetime"],
+    )
+    return _index_vwap(vwap_df)
+
+
+def _parse_trading_days_csv(path: str) -> pd.DataFrame:
+    # 只读取日期列，第0列是写出时留下的行号
+    trading_days = pd.read_csv(
+        path,
+        usecols=["datetime"],
+        parse_dates=["datetime"],
+        memory_map=True,
+        engine="c",
+    )
+    return trading_days
+
+
+def _parse_benchmark_csv(path: str) -> pd.DataFrame:
+    benchmark = pd.read_csv(path, memory_map=True, engine="c", parse_dates=["datetime"])
+    benchmark = benchmark.set_index(["datetime"])
+    return benchmark
+
 
 class BacktestFramework:
     """
     完整的端到端量化回测框架
 
     包含完整的回测流程：
-    1. 数据获取 (get_bar_data, get_vwap_data)
-    2. 信号处理 (get_buy_signal)
-    3. 回测执行 (backtest)
-    4. 性能分析 (performance_analysis)
+    1. 数据覆盖检查 (check_data_coverage_for_signal)
+    2. 数据获取 (get_vwap_data, trading_days, benchmark)
+    3. 权重生成 (generate_portfolio_weights)
+    4. 回测执行 (rolling_backtest)
+    5. 性能分析 (get_performance_analysis)
 
     每个步骤都有清晰的函数界面，便于理解和调试
     """
@@ -67,6 +117,15 @@ class BacktestFramework:
         self.cache_dir = cache_dir
         self.output_dir = output_dir
 
+        # 文件路径在初始化时统一拼接，后续各步骤直接复用
+        self.signal_path = os.path.join(data_dir or "", signal_file)
+        cache_path = Path(cache_dir or "")
+        # 单文件缓存传入CSV路径，read_cached_frame优先读取同名parquet
+        self._vwap_path = cache_path / f"{VWAP_CACHE}.csv"
+        self._vwap_partition_dir = cache_path / VWAP_CACHE
+        self._trading_days_path = cache_path / f"{TRADING_DAYS_CACHE}.csv"
+        self._benchmark_path = cache_path / f"{BENCHMARK_CACHE}.csv"
+
         logger.info(f"初始化回测框架 - 信号文件: {signal_file}")
         logger.info(f"回测时间范围: {start_date} 到 {end_date}")
 
@@ -74,26 +133,29 @@ class BacktestFramework:
 
     def get_vwap_data(self) -> pd.DataFrame:
 
-        # filename = "vwap_df.csv"
-        filename = "vwap_df_tb.csv"
-        vwap_df = pd.read_csv(os.path.join(self.cache_dir, filename))
-        vwap_df["datetime"] = pd.to_datetime(vwap_df["datetime"])
-        vwap_df = vwap_df.set_index(["order_book_id", "datetime"])
-        return vwap_df
-
-    def get_trading_days(self) -> pd.DataFrame:
-        filename = "trading_days.csv"
-        trading_days = pd.read_csv(
-            os.path.join(self.cache_dir, filename), index_col=[0]
-        )
-        return trading_days
-
-    def get_benchmark(self) -> pd.DataFrame:
-        filename = "benchmark.csv"
-        benchmark = pd.read_csv(os.path.join(self.cache_dir, filename))
-        benchmark["datetime"] = pd.to_datetime(benchmark["datetime"])
-        benchmark = benchmark.set_index(["datetime"])
-        return benchmark
+        # 优先读取按交易日分区的数据集，只加载回测区间内的分区
+        try:
+            vwap_df = read_date_partitions(
+                self._vwap_partition_dir, self.start_date, self.end_date
+            )
+        except FileNotFoundError:
+            # 旧版缓存：单个CSV（或由其生成的parquet）文件
+            return read_cached_frame(self._vwap_path, _parse_vwap_csv)
+
+        return _index_vwap(vwap_df)
+
+    # 交易日历和基准只在回测/业绩分析时才用到，首次访问时再读取
+    @cached_property
+    def trading_days(self) -> pd.DatetimeIndex:
+        # 缓存中是单列DataFrame，下游只需要有序的日期序列
+        trading_days = read_cached_frame(
+            self._trading_days_path, _parse_trading_days_csv
+        ).squeeze("columns")
+        return pd.DatetimeIndex(trading_days, name="trade_date")
+
+    @cached_property
+    def benchmark(self) -> pd.DataFrame:
+        return read_cached_frame(self._benchmark_path, _parse_benchmark_csv)
 
     # ==================== 主执行流程 ====================
 
@@ -111,16 +173,14 @@ class BacktestFramework:
         try:
             # 步骤1：数据覆盖检查
             logger.info("\n=== 步骤1: 数据覆盖检查 ===")
-            signal_path = os.path.join(self.data_dir, self.signal_file)
+            signal_path = self.signal_path
 
             # 检查数据覆盖情况（如果有缺失会直接抛出异常停止程序）
             check_data_coverage_for_signal(signal_path, self.cache_dir)
 
-            # 步骤2：获取vwap数据、交易日数据、指数基准数据
-            logger.info("\n=== 步骤2: 从缓存读取vwap、交易日历、指数基准数据 ===")
+            # 步骤2：获取vwap数据（交易日历、指数基准在用到时再读取）
+            logger.info("\n=== 步骤2: 从缓存读取vwap数据 ===")
             vwap_df = self.get_vwap_data()
-            trading_days = self.get_trading_days()
-            benchmark = self.get_benchmark()
 
             # 步骤3：生成投资组合权重
             logger.info("\n=== 步骤3: 生成投资组合权重 ===")
@@ -133,7 +193,7 @@ class BacktestFramework:
             account_result, portfolios = rolling_backtest(
                 portfolio_weights=portfolio_weights,
                 bars_df=vwap_df,
-                trading_days_df=trading_days,
+                trading_days=self.trading_days,
                 portfolio_count=self.portfolio_count,
                 rebalance_frequency=self.rebalance_frequency,
             )
@@ -146,16 +206,25 @@ class BacktestFramework:
 
             # 步骤6：策略回测结果
             logger.info("\n=== 步骤6: 策略回测结果 ===")
-            get_performance_analysis(
+            performance_cumnet, performance_metrics = get_performance_analysis(
                 account_result=account_result,
-                trading_days_df=trading_days,
-                benchmark_df=benchmark,
+                trading_days=self.trading_days,
+                benchmark_df=self.benchmark,
                 portfolio_count=self.portfolio_count,
                 rank_n=self.rank_n,
                 save_path=self.output_dir,
                 annual_turnover=annual_turnover,
             )
 
+            return {
+                "portfolio_weights": portfolio_weights,
+                "account_result": account_result,
+                "portfolios": portfolios,
+                "annual_turnover": annual_turnover,
+                "performance_cumnet": performance_cumnet,
+                "performance_metrics": performance_metrics,
+            }
+
         except Exception as e:
             logger.error(f"\n回测过程中发生错误: {str(e)}")
             raise
@@ -0,0 +1,212 @@
+"""
+缓存读写模块
+负责缓存文件的格式转换：CSV首次解析后落地为parquet，之后直接读取列式二进制；
+以及按交易日分区的parquet数据集读写，支持只补齐缺失日期的增量更新；
+过滤矩阵等远程取数结果按(股票池, 日期区间)落地为parquet，重复运行时跳过网络请求
+"""
+
+import os
+import hashlib
+import functools
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from loguru import logger
+
+# ==================== 缓存文件名 ====================
+# 生产脚本(mask_producing)写出<名称>.parquet；早期版本写出的<名称>.csv仍可读取，
+# 首次读取时转换为同名parquet
+VWAP_CACHE = "vwap_df_tb"  # 按交易日分区的数据集目录
+COMBO_MASK_CACHE = "combo_mask_tb"
+TRADING_DAYS_CACHE = "trading_days"
+BENCHMARK_CACHE = "benchmark"
+
+# 按交易日分区的数据集使用hive风格目录: root/date=YYYY-MM-DD/*.parquet
+_DATE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _mtime(path):
+    """文件修改时间，文件不存在时返回None（一次stat同时完成存在性判断）"""
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def read_cached_frame(csv_path, reader):
+    """
+    读取缓存数据，优先使用同名的parquet文件
+
+    parquet不存在或比CSV旧时，调用reader解析CSV，并把解析结果（含索引和dtype）
+    写成parquet，后续读取无需再做字符串解析、to_datetime和set_index。
+    同一进程内按(路径, 修改时间)缓存结果，参数扫描时重复回测不再读盘；
+    返回的DataFrame在调用方之间共享，不要原地修改
+
+    Args:
+        csv_path: CSV缓存文件路径
+        reader: CSV解析函数，输入文件路径，返回整理好索引的DataFrame
+
+    Returns:
+        pandas.DataFrame: 缓存数据
+    """
+    csv_path = os.fspath(csv_path)
+
+    # 命中内存缓存时只需一次stat：CSV存在取CSV的修改时间，否则取parquet的
+    source_mtime = _mtime(csv_path)
+    if source_mtime is None:
+        source_mtime = _mtime(_parquet_path(csv_path))
+    if source_mtime is None:
+        raise FileNotFoundError(f"缓存文件不存在: {csv_path}")
+
+    return _read_cached_frame(csv_path, reader, source_mtime)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_cached_frame(csv_path, reader, source_mtime):
+    parquet_path = _parquet_path(csv_path)
+    parquet_mtime = _mtime(parquet_path)
+
+    if parquet_mtime is not None and parquet_mtime >= source_mtime:
+        # memory_map让pyarrow直接映射文件页，列数据无需先拷贝到Python缓冲区
+        return pd.read_parquet(parquet_path, engine="pyarrow", memory_map=True)
+
+    df = reader(csv_path)
+
+    try:
+        df.to_parquet(parquet_path, engine="pyarrow", compression="zstd")
+        logger.info(f"已生成parquet缓存: {parquet_path}")
+    except OSError as e:
+        # 缓存目录不可写时不影响本次回测，只是下次仍需解析CSV
+        logger.warning(f"parquet缓存写入失败: {e}")
+
+    return df
+
+
+def list_date_partitions(root):
+    """
+    列出按日期分区的数据集中已有的交易日
+
+    Args:
+        root: 数据集根目录
+
+    Returns:
+        pd.DatetimeIndex: 已落地的日期（升序），目录不存在时为空
+    """
+    if not os.path.isdir(root):
+        return pd.DatetimeIndex([])
+
+    with os.scandir(root) as entries:
+        dates = [
+            entry.name[len("date=") :]
+            for entry in entries
+            if entry.is_dir() and entry.name.startswith("date=")
+        ]
+    return pd.DatetimeIndex(pd.to_datetime(dates, format="%Y-%m-%d")).sort_values()
+
+
+def write_date_partitions(df, root, date_column="datetime"):
+    """
+    把长表数据按日期追加写入分区数据集，已有分区不受影响
+
+    Args:
+        df: 长表数据，需包含date_column列
+        root: 数据集根目录
+        date_column: 用于分区的日期列
+    """
+    df = df.assign(date=pd.to_datetime(df[date_column]).dt.strftime("%Y-%m-%d"))
+    df.to_parquet(
+        root,
+        engine="pyarrow",
+        compression="zstd",
+        partition_cols=["date"],
+        index=False,
+    )
+
+
+def read_date_partitions(root, start_date=None, end_date=None, columns=None):
+    """
+    读取按日期分区的数据集，只扫描[start_date, end_date]内的分区目录
+
+    目录不存在时抛出FileNotFoundError，调用方可据此回退到单文件缓存；
+    同一进程内按(参数, 目录修改时间)缓存结果，新增分区后自动失效；
+    返回的DataFrame在调用方之间共享，不要原地修改
+
+    Args:
+        root: 数据集根目录
+        start_date: 开始日期，None表示不限
+        end_date: 结束日期，None表示不限
+        columns: 需要读取的列，None表示全部数据列
+
+    Returns:
+        pandas.DataFrame: 分区数据（不含分区列date）
+    """
+    start = None if start_date is None else _partition_key(start_date)
+    end = None if end_date is None else _partition_key(end_date)
+    columns = None if columns is None else tuple(columns)
+    return _read_date_partitions(
+        os.fspath(root), start, end, columns, os.path.getmtime(root)
+    )
+
+
+def _partition_key(date):
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+@functools.lru_cache(maxsize=8)
+def _read_date_partitions(root, start, end, columns, root_mtime):
+    dataset = ds.dataset(root, format="parquet", partitioning=_DATE_PARTITIONING)
+
+    date_filter = None
+    if start is not None:
+        date_filter = ds.field("date") >= start
+    if end is not None:
+        end_filter = ds.field("date") <= end
+        date_filter = end_filter if date_filter is None else date_filter & end_filter
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "date"]
+
+    table = dataset.to_table(columns=list(columns), filter=date_filter)
+    return table.to_pandas()
+
+
+def _filter_cache_key(name, stock_list, date_list):
+    stocks_digest = hashlib.sha1(",".join(sorted(stock_list)).encode()).hexdigest()
+    raw_key = f"{name}{min(date_list)}{max(date_list)}{len(date_list)}{stocks_digest}"
+    return hashlib.blake2b(raw_key.encode()).hexdigest()[:16]
+
+
+def cached_filter(name, fetcher, stock_list, date_list, cache_dir):
+    """
+    读取按(股票池, 日期区间)缓存的过滤矩阵，未命中时调用fetcher取数并落地
+
+    Args:
+        name: 过滤器名称，用作缓存文件名前缀
+        fetcher: 取数函数，签名为fetcher(stock_list, date_list)
+        stock_list: 股票列表
+        date_list: 日期列表
+        cache_dir: 缓存目录
+
+    Returns:
+        pandas.DataFrame: 过滤矩阵
+    """
+    key = _filter_cache_key(name, stock_list, date_list)
+    path = os.path.join(cache_dir, f"{name}_{key}.parquet")
+
+    if os.path.exists(path):
+        logger.info(f"命中过滤器缓存: {path}")
+        return pd.read_parquet(path, engine="pyarrow", memory_map=True)
+
+    df = fetcher(stock_list, date_list)
+
+    try:
+        df.to_parquet(path, engine="pyarrow", compression="zstd")
+        logger.info(f"已生成过滤器缓存: {path}")
+    except OSError as e:
+        logger.warning(f"过滤器缓存写入失败: {e}")
+
+    return df
@@ -6,73 +6,125 @@
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
 import os
-from typing import Dict, Set
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Dict
 from signal_reader import read_signal_file
+from cache_utils import COMBO_MASK_CACHE, VWAP_CACHE, read_date_partitions
 from loguru import logger
 
 
+def _format_dates(dates: pd.DatetimeIndex):
+    """错误信息中只展示前10个日期"""
+    return dates.sort_values()[:10].strftime("%Y-%m-%d").tolist()
+
+
 def check_vwap_coverage(
-    signal_stocks: Set, signal_dates: Set, cache_dir: str, vwap_filename: str
+    signal_stocks: pd.Index,
+    signal_dates: pd.DatetimeIndex,
+    cache_dir: str,
+    vwap_filename: str,
 ):
     """检查VWAP数据覆盖情况，如果有缺失直接报错"""
 
     vwap_path = os.path.join(cache_dir, vwap_filename)
+    partition_dir = os.path.splitext(vwap_path)[0]
 
-    if not os.path.exists(vwap_path):
+    if os.path.isdir(partition_dir):
+        # 按交易日分区的数据集：只读股票代码和日期两列
+        vwap_df = read_date_partitions(
+            partition_dir, columns=["order_book_id", "datetime"]
+        )
+    elif os.path.exists(vwap_path):
+        # 读取VWAP数据（只需要股票代码和日期两列）
+        vwap_df = pd.read_csv(
+            vwap_path,
+            usecols=["order_book_id", "datetime"],
+            memory_map=True,
+            engine="c",
+            dtype={"order_book_id": "category"},
+            parse_dates=["datetime"],
+        )
+    else:
         raise FileNotFoundError(f"VWAP文件不存在: {vwap_path}")
 
-    # 读取VWAP数据
-    vwap_df = pd.read_csv(vwap_path)
-    vwap_df["datetime"] = pd.to_datetime(vwap_df["datetime"])
+    # 在Index上做差集，避免把每行时间戳转换成Python的date对象
+    vwap_stocks = pd.Index(vwap_df["order_book_id"].unique())
+    missing_stocks = signal_stocks.difference(vwap_stocks)
 
-    vwap_stocks = set(vwap_df["order_book_id"].unique())
-    vwap_dates = set(vwap_df["datetime"].dt.date)
+    if len(missing_stocks):
+        raise ValueError(
+            f"VWAP数据缺失股票 ({len(missing_stocks)}个): {missing_stocks.sort_values()[:10].tolist()}..."
+        )
 
-    missing_stocks = signal_stocks - vwap_stocks
-    missing_dates = signal_dates - vwap_dates
+    # 先比较首尾日期：信号日期超出缓存范围时直接报错，无需再对全部日期去重求差集
+    vwap_start = vwap_df["datetime"].min().normalize()
+    vwap_end = vwap_df["datetime"].max()
+    out_of_range = signal_dates[(signal_dates < vwap_start) | (signal_dates > vwap_end)]
 
-    if missing_stocks:
+    if len(out_of_range):
         raise ValueError(
-            f"VWAP数据缺失股票 ({len(missing_stocks)}个): {sorted(list(missing_stocks))[:10]}..."
+            f"VWAP数据缺失日期 (超出缓存范围 {vwap_start.date()} 到 {vwap_end.date()} 的有{len(out_of_range)}个): {_format_dates(out_of_range)}..."
         )
 
-    if missing_dates:
+    vwap_dates = pd.DatetimeIndex(vwap_df["datetime"].unique()).normalize()
+    missing_dates = signal_dates.difference(vwap_dates)
+
+    if len(missing_dates):
         raise ValueError(
-            f"VWAP数据缺失日期 ({len(missing_dates)}个): {sorted(list(missing_dates))[:10]}..."
+            f"VWAP数据缺失日期 ({len(missing_dates)}个): {_format_dates(missing_dates)}..."
         )
 
     logger.success(f"✅ VWAP数据覆盖检查通过")
 
 
 def check_mask_coverage(
-    signal_stocks: Set, signal_dates: Set, cache_dir: str, mask_filename: str
+    signal_stocks: pd.Index,
+    signal_dates: pd.DatetimeIndex,
+    cache_dir: str,
+    mask_filename: str,
 ):
     """检查Mask数据覆盖情况，如果有缺失直接报错"""
 
     mask_path = os.path.join(cache_dir, mask_filename)
-
-    if not os.path.exists(mask_path):
+    parquet_path = os.path.splitext(mask_path)[0] + ".parquet"
+
+    if os.path.exists(parquet_path):
+        # parquet：股票列表取自schema，日期只读索引列，不读取整张宽表
+        schema = pq.read_schema(parquet_path)
+        index_columns = set(map(str, schema.pandas_metadata["index_columns"]))
+        mask_stocks = pd.Index(
+            [name for name in schema.names if name not in index_columns]
+        )
+        mask_dates = pd.DatetimeIndex(
+            pd.read_parquet(parquet_path, columns=[]).index
+        ).normalize()
+    elif os.path.exists(mask_path):
+        # 读取Mask数据：表头即股票列表，日期只解析第一列，不解析整张宽表
+        mask_stocks = pd.read_csv(mask_path, index_col=[0], nrows=0).columns
+        mask_dates = pd.read_csv(
+            mask_path,
+            usecols=[0],
+            index_col=[0],
+            parse_dates=True,
+            memory_map=True,
+            engine="c",
+        ).index.normalize()
+    else:
         raise FileNotFoundError(f"Mask文件不存在: {mask_path}")
 
-    # 读取Mask数据
-    mask_df = pd.read_csv(mask_path, index_col=[0])
-    mask_df.index = pd.to_datetime(mask_df.index)
+    missing_stocks = signal_stocks.difference(mask_stocks)
+    missing_dates = signal_dates.difference(mask_dates)
 
-    mask_stocks = set(mask_df.columns)
-    mask_dates = set(mask_df.index.date)
-
-    missing_stocks = signal_stocks - mask_stocks
-    missing_dates = signal_dates - mask_dates
-
-    if missing_stocks:
+    if len(missing_stocks):
         raise ValueError(
-            f"Mask数据缺失股票 ({len(missing_stocks)}个): {sorted(list(missing_stocks))[:10]}..."
+            f"Mask数据缺失股票 ({len(missing_stocks)}个): {missing_stocks.sort_values()[:10].tolist()}..."
         )
 
-    if missing_dates:
+    if len(missing_dates):
         raise ValueError(
-            f"Mask数据缺失日期 ({len(missing_dates)}个): {sorted(list(missing_dates))[:10]}..."
+            f"Mask数据缺失日期 ({len(missing_dates)}个): {_format_dates(missing_dates)}..."
         )
 
     logger.success(f"✅ Mask数据覆盖检查通过")
@@ -81,8 +133,8 @@ def check_mask_coverage(
 def check_data_coverage_for_signal(
     signal_path: str,
     cache_dir: str,
-    vwap_filename: str = "vwap_df_tb.csv",
-    mask_filename: str = "combo_mask_tb.csv",
+    vwap_filename: str = VWAP_CACHE + ".csv",
+    mask_filename: str = COMBO_MASK_CACHE + ".csv",
 ):
     """
     检查指定信号文件的数据覆盖情况，如果有缺失直接报错停止程序
@@ -100,22 +152,46 @@ def check_data_coverage_for_signal(
     logger.info(f"\n📊 读取信号文件: {signal_path}")
     signal_df = read_signal_file(signal_path)
 
-    signal_stocks = set(signal_df["股票代码"].unique())
-    signal_dates = set(pd.to_datetime(signal_df["日期"]).dt.date)
-    signal_start = signal_df["日期"].min()
-    signal_end = signal_df["日期"].max()
+    # 日期列已是datetime，去重后截断到天并排序，起止日期直接取首尾
+    signal_stocks = pd.Index(signal_df["股票代码"].unique())
+    signal_dates = (
+        pd.DatetimeIndex(signal_df["日期"].unique()).normalize().sort_values()
+    )
+    signal_start = signal_dates[0]
+    signal_end = signal_dates[-1]
 
     logger.info(f"   信号文件统计:")
     logger.info(f"   - 股票数量: {len(signal_stocks)}")
     logger.info(f"   - 日期范围: {signal_start.date()} 到 {signal_end.date()}")
     logger.info(f"   - 总记录数: {len(signal_df)}")
 
-    # 2. 检查VWAP数据覆盖（如果有缺失会直接抛出异常）
+    # 2. 并行检查VWAP和Mask数据覆盖（如果有缺失会直接抛出异常）
+    # 两项检查各自读盘解析，互不依赖；任一项失败即返回，不等待另一项
     logger.info(f"\n📈 检查VWAP数据覆盖...")
-    check_vwap_coverage(signal_stocks, signal_dates, cache_dir, vwap_filename)
-
-    # 3. 检查Mask数据覆盖（如果有缺失会直接抛出异常）
     logger.info(f"\n🎭 检查Mask数据覆盖...")
-    check_mask_coverage(signal_stocks, signal_dates, cache_dir, mask_filename)
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        futures = [
+            executor.submit(
+                check_vwap_coverage,
+                signal_stocks,
+                signal_dates,
+                cache_dir,
+                vwap_filename,
+            ),
+            executor.submit(
+                check_mask_coverage,
+                signal_stocks,
+                signal_dates,
+                cache_dir,
+                mask_filename,
+            ),
+        ]
+        wait(futures, return_when=FIRST_EXCEPTION)
+        for future in futures:
+            if future.done():
+                future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     logger.info("=" * 80)
@@ -6,6 +6,8 @@ from scipy import stats
 import statsmodels.api as sm
 from pathlib import Path
 import os
+import hashlib
+import functools
 from rqdatac import *
 from rqfactor import *
 from rqfactor import Factor
@@ -20,26 +22,54 @@ warnings.filterwarnings("ignore")
 
 
 # 动态券池
-def INDEX_FIX(start_date, end_date, index_item):
+@functools.lru_cache(maxsize=32)
+def INDEX_FIX(start_date, end_date, index_item, cache_dir=None):
     """
     :param start_date: 开始日 -> str
     :param end_date: 结束日 -> str
     :param index_item: 指数代码 -> str
+    :param cache_dir: 缓存目录，给定时结果落地为parquet，相同参数再次运行直接读取 -> str
     :return index_fix: 动态因子值 -> unstack
     """
 
+    # 进程内按参数缓存，返回的DataFrame在调用方之间共享，不要原地修改
+    if cache_dir is None:
+        return _build_index_fix(start_date, end_date, index_item)
+
+    key = hashlib.sha1(f"{index_item}|{start_date}|{end_date}".encode()).hexdigest()
+    path = os.path.join(cache_dir, f"index_fix_{key[:12]}.parquet")
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    index_fix = _build_index_fix(start_date, end_date, index_item)
+    index_fix.to_parquet(path, engine="pyarrow", compression="zstd")
+
+    return index_fix
+
+
+def _build_index_fix(start_date, end_date, index_item):
+
+    components = index_components(index_item, start_date=start_date, end_date=end_date)
+
+    # 股票按代码排序作为列，成分股位置一次性写入bool矩阵，不构造逐日的字典
+    all_stocks = sorted({stock for stocks in components.values() for stock in stocks})
+    col_idx = {stock: i for i, stock in enumerate(all_stocks)}
+    rows = np.repeat(
+        np.arange(len(components)), [len(stocks) for stocks in components.values()]
+    )
+    cols = np.fromiter(
+        (col_idx[stock] for stocks in components.values() for stock in stocks),
+        dtype=np.int64,
+        count=len(rows),
+    )
+    mat = np.zeros((len(components), len(all_stocks)), dtype=bool)
+    mat[rows, cols] = True
+
     index_fix = pd.DataFrame(
-        {
-            k: dict.fromkeys(v, True)
-            for k, v in index_components(
-                index_item, start_date=start_date, end_date=end_date
-            ).items()
-        }
-    ).T
-
-    index_fix.fillna(False, inplace=True)
-    index_fix.index.names = ["datetime"]
-    index_fix = index_fix.sort_index(axis=1)
+        mat,
+        index=pd.DatetimeIndex(list(components), name="datetime"),
+        columns=all_stocks,
+    )
 
     return index_fix
 
@@ -58,20 +88,34 @@ def get_new_stock_filter(stock_list, datetime_period, newly_listed_threshold=252
     datetime_period_tmp += [
         pd.to_datetime(get_next_trading_date(datetime_period[-1], 1))
     ]
-    # 获取上市日期
-    listed_datetime_period = [instruments(stock).listed_date for stock in stock_list]
-    # 获取上市后的第252个交易日（新股和老股的分界点）
+    # 获取上市日期（一次批量请求）
+    listed = {
+        ins.order_book_id: pd.Timestamp(ins.listed_date)
+        for ins in instruments(stock_list)
+    }
+    listed_datetime_period = np.array(
+        [listed[stock] for stock in stock_list], dtype="datetime64[D]"
+    )
+    # 获取上市后的第252个交易日（新股和老股的分界点）：
+    # 一次取出交易日历，在日历上二分查找后前推n个交易日；
+    # 日历截止到研究期后一天，超出的位置截断到最后一天，防止分割日在研究日之后
+    end_date = np.datetime64(datetime_period_tmp[-1], "D")
+    calendar = np.array(
+        get_trading_dates(
+            pd.Timestamp(min(listed_datetime_period.min(), end_date)),
+            datetime_period_tmp[-1],
+        ),
+        dtype="datetime64[D]",
+    )
+    pos = (
+        np.searchsorted(calendar, listed_datetime_period, side="right")
+        + newly_listed_threshold
+        - 1
+    )
+    pos = np.minimum(pos, len(calendar) - 1)
     newly_listed_window = pd.Series(
-        index=stock_list,
-        data=[
-            pd.to_datetime(get_next_trading_date(listed_date, n=newly_listed_threshold))
-            for listed_date in listed_datetime_period
-        ],
+        index=stock_list, data=calendar[pos].astype("datetime64[ns]")
     )
-    # 防止分割日在研究日之后，后续填充不存在
-    for k, v in enumerate(newly_listed_window):
-        if v > datetime_period_tmp[-1]:
-            newly_listed_window.iloc[k] = datetime_period_tmp[-1]
 
     # 标签新股，构建过滤表格
     newly_listed_window.index.names = ["order_book_id"]
@@ -88,6 +132,33 @@ def get_new_stock_filter(stock_list, datetime_period, newly_listed_threshold=252
     return newly_listed_window
 
 
+def _shift_up(df):
+    """
+    等价于df.shift(-1).ffill()：整体上移一行，最后一行沿用原最后一行
+
+    Args:
+        df: 日期为行索引的过滤矩阵
+
+    Returns:
+        DataFrame: 上移后的过滤矩阵
+    """
+    if len(df) < 2:
+        # 只有一行时上移后没有可沿用的数据
+        return df.shift(-1).ffill()
+
+    arr = df.to_numpy()
+    shifted = np.empty_like(arr)
+    shifted[:-1] = arr[1:]
+    shifted[-1] = arr[-1]
+    shifted = pd.DataFrame(shifted, index=df.index, columns=df.columns)
+
+    # 原数据本身有缺失（如reindex补出的日期/股票）时仍需前向填充
+    if shifted.isna().to_numpy().any():
+        shifted = shifted.ffill()
+
+    return shifted
+
+
 # st过滤（风险警示标的默认不进行研究）
 def get_st_filter(stock_list, date_list):
     """
@@ -100,7 +171,7 @@ def get_st_filter(stock_list, date_list):
     st_filter = is_st_stock(stock_list, date_list[0], date_list[-1]).reindex(
         columns=stock_list, index=date_list
     )
-    st_filter = st_filter.shift(-1).ffill()
+    st_filter = _shift_up(st_filter)
 
     return st_filter
 
@@ -117,7 +188,7 @@ def get_suspended_filter(stock_list, date_list):
     suspended_filter = is_suspended(stock_list, date_list[0], date_list[-1]).reindex(
         columns=stock_list, index=date_list
     )
-    suspended_filter = suspended_filter.shift(-1).ffill()
+    suspended_filter = _shift_up(suspended_filter)
 
     return suspended_filter
 
@@ -139,12 +210,21 @@ def get_limit_up_filter(stock_list, date_list):
         fields=["open", "limit_up"],
     )
 
-    # 计算涨停掩码：开盘价等于涨停价的情况
-    limit_up_mask = (
-        (price["open"] == price["limit_up"])
-        .unstack("order_book_id")
-        .shift(-1)
-        .fillna(False)
-    )
+    # 计算涨停掩码：开盘价等于涨停价的情况。
+    # 按MultiIndex的codes直接写入(日期, 股票)矩阵，不经过unstack；缺失的组合为False
+    is_limit_up = price["open"].to_numpy() == price["limit_up"].to_numpy()
+    index = price.index.remove_unused_levels()
+    stock_level = index.names.index("order_book_id")
+    date_level = 1 - stock_level
+    stocks = index.levels[stock_level]
+    dates = index.levels[date_level]
+
+    mask = np.zeros((len(dates), len(stocks)), dtype=bool)
+    mask[index.codes[date_level], index.codes[stock_level]] = is_limit_up
+
+    # 上移一行（用下一交易日开盘是否涨停过滤当日信号），最后一行为False
+    shifted = np.zeros_like(mask)
+    shifted[:-1] = mask[1:]
+    limit_up_mask = pd.DataFrame(shifted, index=dates, columns=stocks)
 
     return limit_up_mask
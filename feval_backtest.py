@@ -7,24 +7,52 @@ import sys
 import os
 import yaml
 import time
+import functools
 from loguru import logger
 
+# 脚本所在目录：配置文件相对此目录查找
+_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # 添加当前目录到路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _DIR)
 
 from backtest_framework import BacktestFramework
 from signal_reader import read_signal_file
 
+# 安装了libyaml时使用C实现的解析器
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_config(config_file="backtest_config.yaml"):
+    """
+    读取YAML配置文件
+
+    同一进程内按(路径, 修改时间)缓存解析结果，配置文件修改后自动重新读取；
+    返回的字典在调用方之间共享，不要原地修改
+
+    Args:
+        config_file: 配置文件名（相对脚本所在目录）
+
+    Returns:
+        dict: 配置内容
+    """
+    config_path = os.path.join(_DIR, config_file)
+    return _load_config(config_path, os.path.getmtime(config_path))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(config_path, mtime):
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
 
 def load_config_and_run(config_file="backtest_config.yaml"):
-    """加载配置文件并执行回测"""
+    """加载配置文件并执行回测，返回run_backtest的结果字典"""
 
     # 1. 加载YAML配置文件
     logger.info(f"\n正在加载配置文件...")
     try:
-        config_path = os.path.join(os.path.dirname(__file__), config_file)
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_file)
         logger.success(f"配置文件加载成功")
     except Exception as e:
         logger.error(f"配置文件加载失败: {e}")
@@ -59,10 +87,12 @@ def load_config_and_run(config_file="backtest_config.yaml"):
     # 4. 执行回测
     logger.success(f"\n开始执行回测...")
 
-    framework.run_backtest()
+    results = framework.run_backtest()
     logger.info(f"\n回测完成！")
     logger.info("=" * 60)
 
+    return results
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,19 @@
+"""
+numba编译辅助模块
+numba为可选依赖：未安装时njit退化为原函数、prange退化为range，
+调用方可根据NUMBA_AVAILABLE选择纯numpy实现
+"""
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """无numba时的占位装饰器，支持@njit、@njit(...)和@njit("签名")三种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -3,9 +3,24 @@ import numpy as np
 import os
 import sys
 import re
-from pathlib import Path
+import argparse
+import gc
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 from data_utils import *
+from cache_utils import (
+    BENCHMARK_CACHE,
+    COMBO_MASK_CACHE,
+    TRADING_DAYS_CACHE,
+    VWAP_CACHE,
+    cached_filter,
+    list_date_partitions,
+    write_date_partitions,
+)
+
+# 行情文件名格式："000001.SZ-股票名称-日线后复权及常用指标-20250718.csv"
+_STOCK_RE = re.compile(r"([0-9]{6}\.[A-Z]{2})-(.+?)-日线后复权及常用指标-(\d{8})\.csv")
 
 
 def parse_stock_info_from_filename(filename):
@@ -14,54 +29,46 @@ def parse_stock_info_from_filename(filename):
     输入: "000001.SZ-股票名称-日线后复权及常用指标-20250718.csv"
     输出: ("000001.SZ", "股票名称", "20250718")
     """
-    pattern = r"([0-9]{6}\.[A-Z]{2})-(.+?)-日线后复权及常用指标-(\d{8})\.csv"
-    match = re.match(pattern, filename)
+    match = _STOCK_RE.match(filename)
     if match:
         return match.group(1), match.group(2), match.group(3)
     return None, None, None
 
 
+# 交易所后缀映射：SZ -> XSHE, SH -> XSHG, BJ -> BJSE
+_SUFFIX = {".SZ": ".XSHE", ".SH": ".XSHG", ".BJ": ".BJSE"}
+
+
 def convert_stock_code(original_code):
     """
     转换股票代码格式
     SZ -> XSHE, SH -> XSHG, BJ -> BJSE
     """
-    if original_code.endswith(".SZ"):
-        return original_code.replace(".SZ", ".XSHE")
-    elif original_code.endswith(".SH"):
-        return original_code.replace(".SH", ".XSHG")
-    elif original_code.endswith(".BJ"):
-        return original_code.replace(".BJ", ".BJSE")
-    else:
+    suffix = _SUFFIX.get(original_code[-3:])
+    if suffix is None:
         return None  # 其他格式暂不处理
+    return original_code[:-3] + suffix
 
 
 def get_stock_list_from_csv_folder(csv_folder_path, limit=None):
     """
     从CSV文件夹获取股票列表
     """
-    csv_folder = Path(csv_folder_path)
-    stock_list = []
-
-    for csv_file in csv_folder.glob("*.csv"):
-        original_code, stock_name, date = parse_stock_info_from_filename(csv_file.name)
-
-        if original_code and stock_name:
-            # 转换股票代码
-            converted_code = convert_stock_code(original_code)
-
-            if converted_code:  # 处理SZ、SH和BJ股票
-                stock_list.append(
-                    {
-                        "original_code": original_code,
-                        "converted_code": converted_code,
-                        "stock_name": stock_name,
-                        "date": date,
-                    }
-                )
-
-    # 提取所有converted_code作为返回值
-    converted_codes = [stock["converted_code"] for stock in stock_list]
+    converted_codes = []
+
+    # scandir遍历目录时直接给出文件名，无需为每个文件额外stat
+    with os.scandir(csv_folder_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".csv"):
+                continue
+            match = _STOCK_RE.match(entry.name)
+            if not match:
+                continue
+
+            # 转换股票代码，只处理SZ、SH和BJ股票
+            converted_code = convert_stock_code(match.group(1))
+            if converted_code:
+                converted_codes.append(converted_code)
 
     return converted_codes
 
@@ -70,70 +77,121 @@ def mask_producing(stock_list, stock_universe, cache_dir):
 
     date_list = stock_universe.index.tolist()
 
-    st_filter = get_st_filter(stock_list, date_list)
-    suspended_filter = get_suspended_filter(stock_list, date_list)
-    limit_up_filter = get_limit_up_filter(stock_list, date_list)
-
-    # 填充null值为True（有问题的股票直接过滤）
-    st_filter = st_filter.fillna(True)
-    suspended_filter = suspended_filter.fillna(True)
-    limit_up_filter = limit_up_filter.fillna(True)
-
-    combo_mask = (
-        st_filter.astype(int)
-        + suspended_filter.astype(int)
-        + limit_up_filter.astype(int)
-    ) == 0
-
-    combo_mask.to_csv(os.path.join(cache_dir, "combo_mask_tb.csv"))
-    print("combo_mask saved to " + os.path.join(cache_dir, "combo_mask_tb.csv"))
+    # 过滤矩阵按(股票池, 日期区间)缓存，重复生成时不再请求rqdatac；
+    # 三个过滤器的取数互相独立，并发发出以重叠网络等待
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        st_future = executor.submit(
+            cached_filter, "st_filter", get_st_filter, stock_list, date_list, cache_dir
+        )
+        suspended_future = executor.submit(
+            cached_filter,
+            "suspended_filter",
+            get_suspended_filter,
+            stock_list,
+            date_list,
+            cache_dir,
+        )
+        limit_up_future = executor.submit(
+            cached_filter,
+            "limit_up_filter",
+            get_limit_up_filter,
+            stock_list,
+            date_list,
+            cache_dir,
+        )
+        st_filter = st_future.result()
+        suspended_filter = suspended_future.result()
+        limit_up_filter = limit_up_future.result()
+
+    # 三个过滤矩阵对齐到同一网格（与按元素相加时的外连接对齐一致）
+    filters = [st_filter, suspended_filter, limit_up_filter]
+    index = filters[0].index.union(filters[1].index).union(filters[2].index)
+    columns = filters[0].columns.union(filters[1].columns).union(filters[2].columns)
+
+    # 在bool数组上按位或，null值视为True（有问题的股票直接过滤）
+    filtered = np.zeros((len(index), len(columns)), dtype=bool)
+    for f in filters:
+        filtered |= f.reindex(index=index, columns=columns).to_numpy(
+            dtype=bool, na_value=True
+        )
+    # 中间的过滤矩阵不再需要，及时释放，避免与后续步骤叠加占用内存
+    del st_filter, suspended_filter, limit_up_filter, filters, f
+    np.logical_not(filtered, out=filtered)
+    combo_mask = pd.DataFrame(filtered, index=index, columns=columns)
+
+    # bool矩阵存为parquet，每个值按位存储，读取时无需再解析"True"/"False"文本
+    path = os.path.join(cache_dir, COMBO_MASK_CACHE + ".parquet")
+    combo_mask.to_parquet(path, engine="pyarrow", compression="zstd")
+    print("combo_mask saved to " + path)
 
 
 def vwap_producing(stock_list, stock_universe, cache_dir):
 
-    start_date = stock_universe.index.min()
-    end_date = stock_universe.index.max()
+    # VWAP按交易日分区存储，只拉取分区中还没有的日期
+    partition_dir = os.path.join(cache_dir, VWAP_CACHE)
+    missing_dates = stock_universe.index.difference(list_date_partitions(partition_dir))
+    if missing_dates.empty:
+        print("vwap_df is up to date in " + partition_dir)
+        return
 
-    tech_list = ["total_turnover", "volume"]
-    daily_tech = get_price(
-        stock_list,
-        start_date,
-        end_date,
-        fields=tech_list,
-        adjust_type="post_volume",
-        skip_suspended=False,
-    ).sort_index()
+    start_date = missing_dates.min()
+    end_date = missing_dates.max()
 
-    # 计算后复权VWAP（成交额/后复权调整后的成交量）
-    post_vwap = daily_tech["total_turnover"] / daily_tech["volume"]
+    tech_list = ["total_turnover", "volume"]
 
-    # 获取未复权VWAP价格数据
-    unadjusted_vwap = get_vwap(stock_list, start_date, end_date)
+    # 成交额/成交量和未复权VWAP是两次独立的取数请求，并发发出以重叠网络等待
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tech_future = executor.submit(
+            get_price,
+            stock_list,
+            start_date,
+            end_date,
+            fields=tech_list,
+            adjust_type="post_volume",
+            skip_suspended=False,
+        )
+        vwap_future = executor.submit(get_vwap, stock_list, start_date, end_date)
+
+        daily_tech = tech_future.result().sort_index()
+        # 获取未复权VWAP价格数据
+        unadjusted_vwap = vwap_future.result()
+
+    # 计算后复权VWAP（成交额/后复权调整后的成交量），无成交时记为NaN
+    turnover = daily_tech["total_turnover"].to_numpy(dtype=np.float64)
+    volume = daily_tech["volume"].to_numpy(dtype=np.float64)
+    post_vwap = np.full(turnover.shape, np.nan)
+    np.divide(turnover, volume, out=post_vwap, where=volume > 0)
+    post_vwap = pd.Series(post_vwap, index=daily_tech.index, name="post_vwap")
 
     # 转换为DataFrame并添加后复权VWAP
-    vwap_df = pd.DataFrame({"unadjusted_vwap": unadjusted_vwap, "post_vwap": post_vwap})
+    vwap_df = pd.concat([unadjusted_vwap.rename("unadjusted_vwap"), post_vwap], axis=1)
 
-    # 统一索引名称
+    # 统一索引名称，价格存为float32
     vwap_df.index.names = ["order_book_id", "datetime"]
+    vwap_df = vwap_df.astype({"unadjusted_vwap": "float32", "post_vwap": "float32"})
 
-    vwap_df.to_csv(os.path.join(cache_dir, "vwap_df_tb.csv"))
-    print("vwap_df saved to " + os.path.join(cache_dir, "vwap_df_tb.csv"))
-
-
-def trading_days_producing(stock_universe, cache_dir):
+    vwap_df = vwap_df[vwap_df.index.get_level_values("datetime").isin(missing_dates)]
 
-    start_date = stock_universe.index.min()
-    end_date = stock_universe.index.max()
-    trading_days = pd.DataFrame(get_trading_dates(start_date, end_date))
-    trading_days.columns = ["datetime"]
-    trading_days.to_csv(os.path.join(cache_dir, "trading_days.csv"))
-    print("trading_days saved to " + os.path.join(cache_dir, "trading_days.csv"))
+    write_date_partitions(vwap_df.reset_index(), partition_dir)
+    print(f"vwap_df ({len(missing_dates)} days) saved to " + partition_dir)
 
 
-def benchmark_producing(stock_universe, cache_dir, benchmark_index="000985.XSHG"):
+def trading_days_producing(stock_universe, cache_dir):
 
     start_date = stock_universe.index.min()
     end_date = stock_universe.index.max()
+    trading_days = pd.DataFrame(
+        {"datetime": pd.to_datetime(get_trading_dates(start_date, end_date))}
+    )
+    path = os.path.join(cache_dir, TRADING_DAYS_CACHE + ".parquet")
+    trading_days.to_parquet(path, engine="pyarrow", compression="zstd")
+    print("trading_days saved to " + path)
+
+
+@functools.lru_cache(maxsize=64)
+def _fetch_benchmark_prices(benchmark_index, start_date, end_date):
+    # 同一进程内按(指数, 起止日期)缓存开盘价，参数扫描时不再重复请求；
+    # 返回的DataFrame在调用方之间共享，不要原地修改
     benchmark = get_price(
         [benchmark_index],
         start_date,
@@ -142,31 +200,68 @@ def benchmark_producing(stock_universe, cache_dir, benchmark_index="000985.XSHG"
         adjust_type="none",
     ).open.unstack("order_book_id")
     benchmark.index.names = ["datetime"]
-    benchmark.to_csv(os.path.join(cache_dir, "benchmark.csv"))
-    print("benchmark saved to " + os.path.join(cache_dir, "benchmark.csv"))
+    return benchmark
 
 
-if __name__ == "__main__":
+def benchmark_producing(stock_universe, cache_dir, benchmark_index="000985.XSHG"):
 
-    start_date = "2010-01-01"
-    end_date = "2025-09-20"
-    # 券池指数
-    index_item = "000985.XSHG"
-    # 缓存目录
-    cache_dir = "/Users/didi/DATA/dnn_model/cache"
+    start_date = stock_universe.index.min()
+    end_date = stock_universe.index.max()
+    benchmark = _fetch_benchmark_prices(benchmark_index, start_date, end_date)
+    path = os.path.join(cache_dir, BENCHMARK_CACHE + ".parquet")
+    benchmark.to_parquet(path, engine="pyarrow", compression="zstd")
+    print("benchmark saved to " + path)
 
-    # 基准指数
-    benchmark_index = "000852.XSHG"
-    # 股票池
-    stock_universe = INDEX_FIX(start_date, end_date, index_item)
 
-    # trading_days_producing(stock_universe, cache_dir)
-    # benchmark_producing(stock_universe, cache_dir, benchmark_index)
+def main(argv=None):
+    """
+    命令行入口：生成回测所需的缓存数据
 
+    示例：python mask_producing.py --tasks mask vwap days benchmark
+    """
+    parser = argparse.ArgumentParser(description="生成回测所需的缓存数据")
+    parser.add_argument("--start", default="2010-01-01", help="开始日期")
+    parser.add_argument("--end", default="2025-09-20", help="结束日期")
+    parser.add_argument("--index", default="000985.XSHG", help="券池指数")
+    parser.add_argument("--benchmark", default="000852.XSHG", help="基准指数")
+    parser.add_argument(
+        "--cache-dir", default="/Users/didi/DATA/dnn_model/cache", help="缓存目录"
+    )
     # 从淘宝购买的全A股票池目录
-    csv_folder_path = "/Users/didi/DATA/dnn_model/raw/日线后复权及常用指标csv"
-    # 获取从淘宝购买的全A股票池
-    stock_list = get_stock_list_from_csv_folder(csv_folder_path)
+    parser.add_argument(
+        "--csv-folder",
+        default="/Users/didi/DATA/dnn_model/raw/日线后复权及常用指标csv",
+        help="全A股票行情CSV目录，用于获取股票池",
+    )
+    parser.add_argument(
+        "--tasks",
+        nargs="+",
+        choices=["mask", "vwap", "days", "benchmark"],
+        default=["mask"],
+        help="需要生成的缓存",
+    )
+    args = parser.parse_args(argv)
+
+    # 股票池
+    stock_universe = INDEX_FIX(args.start, args.end, args.index, args.cache_dir)
+
+    if "days" in args.tasks:
+        trading_days_producing(stock_universe, args.cache_dir)
+    if "benchmark" in args.tasks:
+        benchmark_producing(stock_universe, args.cache_dir, args.benchmark)
+
+    if "vwap" in args.tasks or "mask" in args.tasks:
+        # 获取从淘宝购买的全A股票池
+        stock_list = get_stock_list_from_csv_folder(args.csv_folder)
+
+        if "vwap" in args.tasks:
+            vwap_producing(stock_list, stock_universe, args.cache_dir)
+            # VWAP面板较大，生成mask前先回收
+            gc.collect()
+        if "mask" in args.tasks:
+            mask_producing(stock_list, stock_universe, args.cache_dir)
+
+
+if __name__ == "__main__":
 
-    # vwap_producing(stock_list, stock_universe, cache_dir)
-    mask_producing(stock_list, stock_universe, cache_dir)
+    main()
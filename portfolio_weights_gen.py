@@ -9,6 +9,8 @@ import os
 import sys
 
 from signal_reader import read_and_parse_signal_file
+from jit_utils import NUMBA_AVAILABLE, njit, prange
+from cache_utils import COMBO_MASK_CACHE, read_cached_frame
 from data_utils import (
     get_st_filter,
     get_suspended_filter,
@@ -18,31 +20,106 @@ from data_utils import (
 from loguru import logger
 
 
+def _parse_combo_mask_csv(path):
+    # 早期版本的CSV缓存，首次读取后由read_cached_frame转为parquet；
+    # pyarrow多线程解析，结果统一为bool，parquet中即按bool存储
+    combo_mask = pd.read_csv(path, index_col=0, engine="pyarrow")
+    combo_mask.index = pd.to_datetime(combo_mask.index).rename(None)
+    return combo_mask.astype(bool)
+
+
+# numpy选股每次处理的行数（256行×数千只股票的float32约数MB）
+_SELECT_BLOCK_ROWS = 256
+
+
 # 动态选股：确保每日选出rank_n只股票（考虑停牌过滤）
-def select_top_n_stocks(row, n):
+def select_top_n(scores, n):
     """
     从每行中选出排名最前的n只股票（跳过NaN）
 
+    用np.partition求出每行第n小的排名作为阈值，按行分块向量化处理；
+    阈值上有并列时按列顺序取前者，与Series.nsmallest(keep="first")一致。
+    有效股票不足n只的行全部选中
+
     Args:
-        row: 包含股票排名的Series
+        scores: 排名矩阵（行为日期，列为股票），NaN表示不可选
         n: 要选择的股票数量
 
     Returns:
-        Series: 选中的股票标记为1，其余为NaN
+        np.ndarray: 与scores同形状的bool矩阵，True表示被选中
     """
-    # 获取非空值的排名
-    valid_scores = row.dropna()
-    if len(valid_scores) == 0:
-        return pd.Series(index=row.index, dtype=float)  # 全部返回NaN
+    valid = ~np.isnan(scores)
+    if n >= scores.shape[1]:
+        return valid
+
+    # 按行分块处理：每块的分区、比较和累加临时数组都能留在缓存中，
+    # 也不会为整个矩阵同时分配多份同尺寸的临时数组
+    selected = np.empty(scores.shape, dtype=bool)
+    for start in range(0, scores.shape[0], _SELECT_BLOCK_ROWS):
+        block = slice(start, start + _SELECT_BLOCK_ROWS)
+        selected[block] = _select_top_n_block(scores[block], valid[block], n)
+    return selected
 
-    # 按排名升序排序，取前n个（排名越小越好）
-    top_n_stocks = valid_scores.nsmallest(n).index
 
-    # 创建结果序列
-    result = pd.Series(index=row.index, dtype=float)
-    result[top_n_stocks] = 1  # 被选中的股票设为1
+def _select_top_n_block(scores, valid, n):
+    filled = np.where(valid, scores, np.inf)
+    # 每行第n小的值（有效股票不足n只时为inf，此时有效股票都小于阈值）
+    threshold = np.partition(filled, n - 1, axis=1)[:, n - 1 : n]
 
-    return result
+    below = filled < threshold
+    ties = valid & (filled == threshold)
+    need = n - below.sum(axis=1, keepdims=True)
+    return below | (ties & (np.cumsum(ties, axis=1) <= need))
+
+
+@njit(parallel=True, cache=True)
+def _select_top_n_kernel(scores, tradable, n):
+    """
+    过滤与选股合并为一次遍历：按行并行，每行用长度为n的有序数组做插入排序，
+    只保留可交易股票中排名最小的n只。只有严格更小才替换，
+    并列时保留列顺序靠前者，与select_top_n结果一致
+
+    Args:
+        scores: 排名矩阵，NaN表示无信号
+        tradable: 与scores同形状的bool矩阵，False表示不可交易
+        n: 要选择的股票数量
+
+    Returns:
+        tuple: (bool选股矩阵, 每列是否被选中过的bool数组)
+    """
+    n_rows, n_cols = scores.shape
+    selected = np.zeros((n_rows, n_cols), dtype=np.bool_)
+    used = np.zeros(n_cols, dtype=np.bool_)
+    if n <= 0:
+        return selected, used
+
+    for i in prange(n_rows):
+        top_values = np.empty(n, dtype=scores.dtype)
+        top_columns = np.empty(n, dtype=np.int64)
+        count = 0
+        for j in range(n_cols):
+            value = scores[i, j]
+            if not tradable[i, j] or np.isnan(value):
+                continue
+            if count < n:
+                pos = count
+                count += 1
+            elif value < top_values[n - 1]:
+                pos = n - 1
+            else:
+                continue
+            while pos > 0 and top_values[pos - 1] > value:
+                top_values[pos] = top_values[pos - 1]
+                top_columns[pos] = top_columns[pos - 1]
+                pos -= 1
+            top_values[pos] = value
+            top_columns[pos] = j
+        for k in range(count):
+            selected[i, top_columns[k]] = True
+            # 各行只会写入True，并行写同一位置不影响结果
+            used[top_columns[k]] = True
+
+    return selected, used
 
 
 def apply_filters_and_select_stocks(pivot_df, cache_dir, rank_n):
@@ -70,29 +147,50 @@ def apply_filters_and_select_stocks(pivot_df, cache_dir, rank_n):
     #     pivot_df.mask(suspended_filter).mask(st_filter).mask(limit_up_filter)
     # )
 
-    combo_mask = pd.read_csv(
-        os.path.join(cache_dir, "combo_mask_tb.csv"), index_col=[0]
+    combo_mask = read_cached_frame(
+        os.path.join(cache_dir, COMBO_MASK_CACHE + ".csv"), _parse_combo_mask_csv
     )
-    combo_mask.index = pd.to_datetime(combo_mask.index)
-    filtered_pivot = pivot_df.mask(~combo_mask)
+
+    # 过滤矩阵按信号的日期/股票取位置后在ndarray上一次取出，
+    # 缺失的日期/股票视为不可交易，不构造中间DataFrame
+    rows = combo_mask.index.get_indexer(pivot_df.index)
+    cols = combo_mask.columns.get_indexer(pivot_df.columns)
+    tradable = combo_mask.to_numpy(dtype=bool)[np.ix_(rows, cols)]
+    tradable[rows < 0] = False
+    tradable[:, cols < 0] = False
+    # 透视表已是float32，选股只读不写，无需复制
+    scores = np.ascontiguousarray(pivot_df.to_numpy(dtype=np.float32))
 
     # 2. 对每一行（每个交易日）应用选股逻辑
     logger.info(f"开始动态选股，目标每日选出{rank_n}只股票...")
-    filtered_pivot = filtered_pivot.apply(
-        lambda row: select_top_n_stocks(row, rank_n), axis=1
-    )
-
-    # 3. 删除从未被选中的股票（列删除）
-    filtered_pivot = filtered_pivot.dropna(axis=1, how="all")
-
-    # 4. 向后推移一天（避免未来函数）
-    buy_list = filtered_pivot.shift(1)
+    if NUMBA_AVAILABLE:
+        selected, used = _select_top_n_kernel(
+            scores, np.ascontiguousarray(tradable), rank_n
+        )
+    else:
+        # 按可交易矩阵保留排名，不可交易处为NaN，不对过滤矩阵取反
+        selected = select_top_n(np.where(tradable, scores, np.nan), rank_n)
+        used = selected.any(axis=0)
+
+    # 3. 删除从未被选中的股票（列删除）：选股时已记录被选中过的列，直接切片
+    keep = np.flatnonzero(used)
+
+    # 4. 向后推移一天（避免未来函数）：第i日的持仓取第i-1日的选股结果
+    holdings = selected[:-1, keep]
+    counts = holdings.sum(axis=1)
 
     # 5. 删除完全没有信号的日期（行删除）
-    buy_list = buy_list.dropna(how="all")
-
-    # 6. 计算权重
-    portfolio_weights = buy_list.div(buy_list.sum(axis=1), axis=0)
+    has_signal = counts > 0
+    holdings = holdings[has_signal]
+
+    # 6. 计算权重：持仓股票等权，每日只求一次持仓数的倒数后直接填入，未持仓处保持NaN
+    inverse_counts = 1.0 / counts[has_signal]
+    weights = np.where(holdings, inverse_counts[:, None], np.nan)
+    portfolio_weights = pd.DataFrame(
+        weights,
+        index=pivot_df.index[1:][has_signal],
+        columns=pivot_df.columns[keep],
+    )
 
     return portfolio_weights
 
@@ -103,6 +201,7 @@ def generate_portfolio_weights(file_path, cache_dir, rank_n=30):
 
     Args:
         file_path: 信号文件的完整路径
+        cache_dir: 缓存目录（过滤矩阵和信号透视表缓存）
         rank_n: 每日选股数量
 
     Returns:
@@ -112,7 +211,7 @@ def generate_portfolio_weights(file_path, cache_dir, rank_n=30):
     logger.info(f"选股数量: {rank_n}")
 
     # 1. 读取信号文件并转换为透视表
-    pivot_df = read_and_parse_signal_file(file_path)
+    pivot_df = read_and_parse_signal_file(file_path, cache_dir)
 
     if pivot_df is None or pivot_df.empty:
         logger.error("错误：无法读取或解析信号文件")
@@ -66,12 +66,12 @@ def calc_turnover_rate(portfolios_dict, portfolio_count, rebalance_frequency):
     return annual_turnover
 
 
-def get_previous_trading_date_from_df(trading_days_df, target_date, n=1):
+def get_previous_trading_date_from_df(trading_days, target_date, n=1):
     """
-    从trading_days DataFrame中获取指定日期前n个交易日
+    从交易日历中获取指定日期前n个交易日
 
     Args:
-        trading_days_df: 包含交易日期的DataFrame
+        trading_days: 升序排列的交易日DatetimeIndex
         target_date: 目标日期
         n: 前推的交易日数量，默认为1
 
@@ -81,17 +81,14 @@ def get_previous_trading_date_from_df(trading_days_df, target_date, n=1):
     # 转换目标日期为pandas Timestamp
     target_date = pd.to_datetime(target_date)
 
-    # 获取交易日期列表并排序
-    trading_dates = pd.to_datetime(trading_days_df["datetime"]).sort_values()
+    # 二分查找严格小于目标日期的交易日个数
+    pos = trading_days.searchsorted(target_date, side="left")
 
-    # 找到严格小于目标日期的所有交易日
-    valid_dates = trading_dates[trading_dates < target_date]
-
-    if len(valid_dates) < n:
+    if pos < n:
         raise ValueError(f"在{target_date}之前没有足够的{n}个交易日")
 
     # 返回前n个交易日
-    return valid_dates.iloc[-n]
+    return trading_days[pos - n]
 
 
 def calculate_target_holdings(
@@ -228,7 +225,7 @@ def get_stock_vwap(vwap_data, adjust):
 def rolling_backtest(
     portfolio_weights,
     bars_df,
-    trading_days_df,
+    trading_days,
     portfolio_count=12,
     rebalance_frequency="daily",
     initial_capital=10000 * 10000,
@@ -249,6 +246,7 @@ def rolling_backtest(
         - "monthly": 每月调仓（默认）
         - int: 自定义天数间隔（如12表示每12天调仓）
     :param bars_df: 股票价格数据 -> DataFrame
+    :param trading_days: 升序交易日历 -> DatetimeIndex
     :param initial_capital: 初始资金 -> float
     :param stamp_tax_rate: 印花税费率 -> float
     :param transfer_fee_rate: 过户费费率 -> float
@@ -553,7 +551,7 @@ def rolling_backtest(
     # =========================== 添加初始记录 ===========================
     #   在第一个交易日之前添加初始资本记录
     initial_date = get_previous_trading_date_from_df(
-        trading_days_df, account_history.index.min(), 1
+        trading_days, account_history.index.min(), 1
     )
     account_history.loc[initial_date] = [initial_capital, 0, initial_capital]
     account_history = account_history.sort_index()
@@ -7,7 +7,10 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import csv
+import hashlib
 import sys
+import functools
 
 
 def add_exchange_suffix(stock_code):
@@ -34,21 +37,60 @@ def add_exchange_suffix(stock_code):
         return stock_code
 
 
+def _add_exchange_suffixes(stock_codes):
+    """
+    add_exchange_suffix的向量化版本：按代码前两位一次性匹配交易所，
+    不再逐行调用Python函数
+
+    Args:
+        stock_codes: 不带后缀的股票代码Series
+
+    Returns:
+        np.ndarray: 带交易所后缀的股票代码
+    """
+    codes = stock_codes.astype(str)
+    prefix = codes.str[:2]
+    conditions = [
+        prefix.isin(["60", "68"]),  # 上交所：主板和科创板
+        prefix.isin(["00", "30"]),  # 深交所：主板、创业板
+        prefix.isin(["43", "83", "87", "92"]),  # 北交所：所有类型
+    ]
+    choices = [codes + ".XSHG", codes + ".XSHE", codes + ".BJSE"]
+
+    # 不匹配任何规则的代码保持原样，每个代码只警告一次
+    unknown = ~(conditions[0] | conditions[1] | conditions[2])
+    for stock_code in codes[unknown].unique():
+        print(f"警告：股票代码 {stock_code} 不匹配任何交易所规则")
+
+    return np.select(conditions, choices, default=codes)
+
+
+def _drop_missing_rows(df, column):
+    # 信号文件通常没有残缺行，此时直接返回原表，不为dropna/reset_index复制整张长表
+    missing = df[column].isna()
+    if missing.any():
+        df = df[~missing].reset_index(drop=True)
+    return df
+
+
 def _parse_signal_with_rank(file_handle):
     """
     解析带排名的信号文件格式：日期 股票代码 排名
     """
-    data = []
-    for line in file_handle:
-        line = line.strip()
-        if line:  # 跳过空行
-            parts = line.split()
-            if len(parts) >= 3:
-                date = parts[0]
-                stock_code = parts[1]
-                rank = int(parts[2])
-                data.append({"日期": date, "股票代码": stock_code, "排名": rank})
-    return data
+    # C解析器一次读入，多余的列忽略，不足三列的行丢弃
+    df = pd.read_csv(
+        file_handle,
+        sep=r"\s+",
+        header=None,
+        names=["日期", "股票代码", "排名"],
+        usecols=[0, 1, 2],
+        dtype={"日期": str, "股票代码": str},
+        encoding="utf-8",
+        engine="c",
+    )
+    df = _drop_missing_rows(df, "排名")
+    df["排名"] = df["排名"].astype(np.int64)
+    return df
 
 
 def _parse_signal_without_rank(file_handle):
@@ -56,24 +98,25 @@ def _parse_signal_without_rank(file_handle):
     解析不带排名的信号文件格式：日期_股票代码
     根据每日出现顺序自动分配排名
     """
-    data = []
-    daily_rank = {}  # 记录每日的排名计数器
-
-    for line in file_handle:
-        line = line.strip()
-        if line:  # 跳过空行
-            if "_" in line and len(line.split("_")) == 2:
-                date_str, stock_code = line.split("_")
-
-                # 为每个日期维护独立的排名计数器
-                if date_str not in daily_rank:
-                    daily_rank[date_str] = -1
-
-                daily_rank[date_str] += 1
-                rank = daily_rank[date_str]
+    # 按"_"切分为两列，切出多于两段的行跳过，没有"_"的行丢弃
+    df = pd.read_csv(
+        file_handle,
+        sep="_",
+        header=None,
+        names=["日期", "股票代码"],
+        dtype=str,
+        quoting=csv.QUOTE_NONE,
+        on_bad_lines="skip",
+        encoding="utf-8",
+        engine="c",
+    )
+    df = _drop_missing_rows(df, "股票代码")
+    df["日期"] = df["日期"].str.strip()
+    df["股票代码"] = df["股票代码"].str.strip()
 
-                data.append({"日期": date_str, "股票代码": stock_code, "排名": rank})
-    return data
+    # 每个日期内按出现顺序从0开始编号
+    df["排名"] = df.groupby("日期", sort=False).cumcount()
+    return df
 
 
 def detect_signal_format(file_path):
@@ -87,17 +130,21 @@ def detect_signal_format(file_path):
         str: 'with_rank' 或 'without_rank'
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            first_line = f.readline().strip()
-            if "_" in first_line and len(first_line.split("_")) == 2:
-                return "without_rank"  # 新格式：日期_股票代码
-            else:
-                return "with_rank"  # 旧格式：日期 股票代码 排名
+        with open(file_path, "rb") as f:
+            return _sniff_signal_format(f)
     except Exception as e:
         print(f"检测文件格式时出错: {e}")
         return None
 
 
+def _sniff_signal_format(file_handle):
+    # 只看首行原始字节中"_"的个数，无需解码
+    first_line = file_handle.readline().strip()
+    if first_line.count(b"_") == 1:
+        return "without_rank"  # 新格式：日期_股票代码
+    return "with_rank"  # 旧格式：日期 股票代码 排名
+
+
 def read_signal_file(file_path):
     """
     读取信号文件并返回结构化数据
@@ -113,50 +160,55 @@ def read_signal_file(file_path):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"信号文件不存在: {file_path}")
 
-    # 检测文件格式
-    format_type = detect_signal_format(file_path)
-    if format_type is None:
-        return None
+    # 同一进程内按(路径, 修改时间)缓存解析结果：覆盖检查、日期范围解析和权重生成
+    # 都会读取同一信号文件，只需解析一次；返回的DataFrame在调用方之间共享，不要原地修改
+    return _read_signal_file(os.fspath(file_path), os.path.getmtime(file_path))
 
-    print(f"检测到信号格式: {format_type}")
 
-    # 读取文件数据
-    data = []
+@functools.lru_cache(maxsize=4)
+def _read_signal_file(file_path, mtime):
+    # 检测格式和读取数据共用一次open：嗅探首行后回到文件开头交给解析器
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
+        with open(file_path, "rb") as f:
+            format_type = _sniff_signal_format(f)
+            print(f"检测到信号格式: {format_type}")
+            f.seek(0)
+
             if format_type == "without_rank":
                 # 新格式：日期_股票代码（不带排名）
-                data = _parse_signal_without_rank(f)
+                df = _parse_signal_without_rank(f)
             else:
                 # 旧格式：日期 股票代码 排名（带排名）
-                data = _parse_signal_with_rank(f)
-
+                df = _parse_signal_with_rank(f)
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame()
     except Exception as e:
         print(f"读取文件时出错: {e}")
         return None
 
-    # 转换为DataFrame
-    df = pd.DataFrame(data)
-
     if df.empty:
         print("警告：文件为空或没有有效数据")
         return df
 
     print(f"读取到 {len(df)} 条信号记录")
 
+    # 按首行判断日期格式，整列只按该格式解析一次，不再先用错误格式整列试错；
+    # cache=True时重复的日期字符串只解析一次
+    if "-" in df["日期"].iat[0]:
+        date_format = "%Y-%m-%d"  # 新格式：2020-01-02
+    else:
+        date_format = "%Y%m%d"  # 旧格式：20160104
     try:
-        # 尝试新格式：2020-01-02
-        df["日期"] = pd.to_datetime(df["日期"], format="%Y-%m-%d")
+        df["日期"] = pd.to_datetime(df["日期"], format=date_format, cache=True)
     except ValueError:
-        try:
-            # 尝试旧格式：20160104
-            df["日期"] = pd.to_datetime(df["日期"], format="%Y%m%d")
-        except ValueError:
-            print("使用自动推断格式")
-            df["日期"] = pd.to_datetime(df["日期"])
+        print("使用自动推断格式")
+        df["日期"] = pd.to_datetime(df["日期"], cache=True)
 
-    # 添加交易所后缀到股票代码
-    df["股票代码"] = df["股票代码"].apply(add_exchange_suffix)
+    # 添加交易所后缀到股票代码；以Arrow字符串存储，去重、编码时在连续的UTF-8缓冲区上哈希，
+    # 不再逐个处理Python字符串对象
+    df["股票代码"] = pd.array(
+        _add_exchange_suffixes(df["股票代码"]), dtype="string[pyarrow]"
+    )
 
     return df
 
@@ -169,7 +221,7 @@ def convert_to_pivot_table(signal_df):
         signal_df: 信号DataFrame，包含日期、股票代码、排名列
 
     Returns:
-        pandas.DataFrame: 日期为行索引，股票代码为列标签，排名为值的透视表
+        pandas.DataFrame: 日期为行索引，股票代码为列标签，排名为值（float32）的透视表
     """
     if signal_df is None or signal_df.empty:
         return pd.DataFrame()
@@ -178,11 +230,27 @@ def convert_to_pivot_table(signal_df):
 
     # 将数据重构为透视表格式
     # 日期作为行索引，股票代码作为列标签，排名作为值
-    pivot_df = signal_df.pivot_table(
-        index="日期",
-        columns="股票代码",
-        values="排名",
-        aggfunc="first",  # 如果有重复，取第一个值
+    # 日期和股票代码各自编码为整数后直接写入二维数组，不经过pivot_table的分组聚合
+    date_codes, dates = pd.factorize(signal_df["日期"], sort=True)
+    stock_codes, stocks = pd.factorize(signal_df["股票代码"], sort=True)
+    # 排名是整数，float32可精确表示，后续每次整矩阵遍历的数据量减半
+    ranks = signal_df["排名"].to_numpy(dtype=np.float32)
+
+    # 如果有重复，取第一个值
+    first = ~pd.Index(date_codes * len(stocks) + stock_codes).duplicated(keep="first")
+    if not first.all():
+        date_codes = date_codes[first]
+        stock_codes = stock_codes[first]
+        ranks = ranks[first]
+
+    values = np.full((len(dates), len(stocks)), np.nan, dtype=np.float32)
+    values[date_codes, stock_codes] = ranks
+
+    pivot_df = pd.DataFrame(
+        values,
+        index=pd.DatetimeIndex(dates, name="日期"),
+        # 列标签转回object，与VWAP、过滤矩阵中的股票代码类型一致，对齐时无需跨类型比较
+        columns=pd.Index(stocks, dtype=object, name="股票代码"),
     )
 
     return pivot_df
@@ -218,15 +286,44 @@ def get_stock_list_from_signal(file_path):
 
 
 # 向后兼容的函数
-def read_and_parse_signal_file(file_path):
+def read_and_parse_signal_file(file_path, cache_dir=None):
     """
     读取并解析信号文件，返回透视表格式的数据
 
+    指定cache_dir时，透视表以parquet落地，文件名包含信号文件路径摘要和修改时间；
+    信号文件未改动时直接读取parquet，跳过文本解析和透视
+
     Args:
         file_path: 信号文件路径
+        cache_dir: 透视表缓存目录（可选）
 
     Returns:
         pandas.DataFrame: 透视表格式的信号数据
     """
+    if cache_dir is None or not os.path.exists(file_path):
+        signal_df = read_signal_file(file_path)
+        return convert_to_pivot_table(signal_df)
+
+    cache_path = _pivot_cache_path(file_path, cache_dir)
+    if os.path.exists(cache_path):
+        print(f"读取信号透视表缓存: {cache_path}")
+        return pd.read_parquet(cache_path, engine="pyarrow", memory_map=True)
+
     signal_df = read_signal_file(file_path)
-    return convert_to_pivot_table(signal_df)
+    pivot_df = convert_to_pivot_table(signal_df)
+
+    if not pivot_df.empty:
+        try:
+            pivot_df.to_parquet(cache_path, engine="pyarrow", compression="zstd")
+        except OSError as e:
+            # 缓存目录不可写时不影响本次回测
+            print(f"信号透视表缓存写入失败: {e}")
+
+    return pivot_df
+
+
+def _pivot_cache_path(file_path, cache_dir):
+    # 路径摘要区分不同信号文件，修改时间（纳秒）保证文件更新后缓存自动失效
+    digest = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:12]
+    mtime_ns = os.stat(file_path).st_mtime_ns
+    return os.path.join(cache_dir, f"signal_pivot_{digest}_{mtime_ns}.parquet")